@@ -3,17 +3,87 @@
 import argparse
 import asyncio
 import math
+import numpy as np
 import pygame   # type: ignore
-import random
 import time
-from typing import Tuple
 
 import cProfile
 import pstats
 
-
-XY = Tuple[float, float]
-COLOR = Tuple[int, int, int]
+# numba is optional: when present, the swarm step runs as a
+# compiled, multi-threaded loop instead of numpy expressions
+try:
+    from numba import njit, prange   # type: ignore
+except ImportError:
+    njit = None
+
+
+def makeStepScratch(n: int):
+    """preallocate the intermediate arrays stepTowardCentroid
+    needs for up to n points: a delta buffer and two 1-d work
+    buffers"""
+    return (np.empty((n, 2), dtype=np.float32),
+            np.empty(n, dtype=np.float32),
+            np.empty(n, dtype=np.float32))
+
+
+def stepTowardCentroid(p: np.ndarray, centroid: np.ndarray,
+                       travel: float, inv=None, scratch=None):
+    """Move every point in p (in place) a step of length travel
+    toward the centroid, clamping so nobody overshoots within
+    one pixel. This is the whole per-frame arithmetic, kept as
+    a standalone kernel over plain arrays.
+
+    inv, if given, is a recently cached 1/distance array to
+    reuse instead of recomputing; returns the inv used, so the
+    caller can cache it. scratch, from makeStepScratch, lets the
+    kernel work in preallocated buffers instead of fresh
+    temporaries. The compiled path always recomputes (the loop
+    is cheaper than the cache) and returns None."""
+    if njit is not None:
+        _stepCompiled(p, centroid[0], centroid[1], np.float32(travel))
+        return None
+    if scratch is None:
+        scratch = makeStepScratch(p.shape[0])
+    n = p.shape[0]
+    d, d2, work = scratch[0][:n], scratch[1][:n], scratch[2][:n]
+    np.subtract(centroid, p, out=d)
+    if inv is None:
+        # squared distance, then one reciprocal sqrt; cheaper than
+        # hypot plus two divides, and the max(1, ...) clamp comes
+        # free -- each pass lands in a reused buffer
+        np.multiply(d[:, 0], d[:, 0], out=d2)
+        np.multiply(d[:, 1], d[:, 1], out=work)
+        np.add(d2, work, out=d2)
+        np.maximum(d2, 1.0, out=d2)
+        np.sqrt(d2, out=d2)
+        inv = np.reciprocal(d2, out=d2)
+    # apply the step in place too: scale the deltas, then add
+    np.multiply(inv, np.float32(travel), out=work)
+    np.multiply(d, work[:, None], out=d)
+    np.add(p, d, out=p)
+    return inv
+
+
+if njit is not None:
+    # The explicit signature compiles eagerly at import (dtypes
+    # never vary: contiguous float32 positions, float32 scalars)
+    # and cache=True keeps the compiled code on disk, so later
+    # runs skip the jit cost entirely instead of paying it on
+    # the first frame.
+    @njit('void(f4[:, ::1], f4, f4, f4)',
+          parallel=True, fastmath=True, cache=True, boundscheck=False)
+    def _stepCompiled(p, cx, cy, travel):
+        # same step as stepTowardCentroid, written as the scalar
+        # loop numba wants so LLVM can SIMD it and prange can
+        # spread bots across cores
+        for i in prange(p.shape[0]):
+            dx = cx - p[i, 0]
+            dy = cy - p[i, 1]
+            dist = max(1.0, math.sqrt(dx * dx + dy * dy))
+            s = travel / dist
+            p[i, 0] += s * dx
+            p[i, 1] += s * dy
 
 class Arena():
     """The arena containing the robot swarm"""
@@ -27,24 +97,79 @@ class Arena():
         self.keepRunning = True
         self.width = 1000
         self.height = 750
-        self.surface = pygame.display.set_mode((self.width, self.height))
+        # Prefer SDL2's hardware renderer: the frame becomes one
+        # texture upload and one GPU present instead of a software
+        # surface flip. The module is semi-official, so fall back
+        # to plain display.set_mode without it.
+        try:
+            from pygame._sdl2.video import \
+                Window, Renderer, Texture   # type: ignore
+            self.window = Window("swarmbots",
+                                 size=(self.width, self.height))
+            self.renderer = Renderer(self.window)
+            self.surface = pygame.Surface((self.width, self.height))
+            self.texture = Texture(self.renderer,
+                                   (self.width, self.height),
+                                   streaming=True)
+        except ImportError:
+            self.renderer = None
+            self.surface = pygame.display.set_mode(
+                (self.width, self.height))
+        # pre-bind the per-frame pygame calls once, skipping the
+        # pygame.x.y attribute walk on every frame
+        self.blitArray = pygame.surfarray.blit_array
+        self.flip = pygame.display.flip
+        # only quit and keydown matter to us; block the rest at
+        # the source so they never allocate Event objects or pile
+        # up in the queue
+        self.wantedEvents = [pygame.QUIT, pygame.KEYDOWN]
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(self.wantedEvents)
+        # pixel buffer the robots get scattered into each frame,
+        # blitted to the surface in one go
+        self.pixels = np.zeros((self.width, self.height, 3), dtype=np.uint8)
+        # the pixel coordinates written on the previous frame,
+        # so the next frame can erase just those
+        self.prevDrawn = None
         self.drawInterval = 1.0 / 15
 
     def initForSwarm(self, numberOfRobots: int):
-        def randomBot():
-            # random position and color
-            x = random.randrange(0, self.width)
-            y = random.randrange(0, self.height)
-            r = random.randrange(0, 255)
-            g = random.randrange(0, 255)
-            b = random.randrange(0, 255)
-            # random length for its async nap
-            napMsec = random.randrange(20, 200)
-            nap = napMsec / 1000.0
-            robot = Robot(self, (x, y), (r, g, b), nap)
-            return robot
-
-        self.robots = [randomBot() for _ in range(numberOfRobots)]
+        # The swarm is pure structure-of-arrays: positions, colors
+        # and nap lengths live in parallel numpy arrays, one row
+        # per robot, so the hot loops run as single numpy passes
+        # instead of touching 20_000 Python objects.
+        rng = np.random.default_rng()
+        self.positions = np.empty((numberOfRobots, 2), dtype=np.float32)
+        self.positions[:, 0] = rng.uniform(0, self.width, numberOfRobots)
+        self.positions[:, 1] = rng.uniform(0, self.height, numberOfRobots)
+        self.colors = rng.integers(
+            0, 255, (numberOfRobots, 3), dtype=np.uint8)
+        # random length for each robot's async nap, 20-200 msec
+        self.naps = rng.integers(
+            20, 200, numberOfRobots).astype(np.float32) / 1000.0
+        # Group robots with similar naps into cohorts that wake up
+        # together, so async mode runs a handful of tasks instead
+        # of one per robot.
+        bucketIds = np.round(self.naps * 50).astype(np.int32)
+        self.cohorts = [(bucket / 50.0, np.nonzero(bucketIds == bucket)[0])
+                        for bucket in np.unique(bucketIds)]
+        # robots all travel the same speed, in whatever direction
+        self.pixPerSecond = 50
+        # one timestamp for the whole swarm in sync mode
+        self.prevTime = time.perf_counter()
+        # memoized 1/distance array for updateAll, good while the
+        # centroid sits still and the cache is fresh
+        self.invCache = None
+        self.invCacheCentroid = None
+        self.invCacheAge = 0
+        # scratch buffers for updateAll's kernel passes; not
+        # shared with anything else, since invCache aliases them
+        self.stepScratch = makeStepScratch(numberOfRobots)
+        # separate scratch plus a gather buffer for updateSubset,
+        # sized for the biggest possible subset
+        self.subsetScratch = makeStepScratch(numberOfRobots)
+        self.subsetPositions = np.empty(
+            (numberOfRobots, 2), dtype=np.float32)
         self.centroid = self.refreshCentroid()
 
     def runSync(self, stopAfterNFrames=0):
@@ -63,19 +188,39 @@ class Arena():
             if stopAfterNFrames and nFrames >= stopAfterNFrames:
                 break
 
-            for robot in self.robots:
-                robot.update()
+            # one clock read per frame: the timestamp taken at the
+            # top of the loop also drives the physics step
+            self.updateAll(now - self.prevTime)
+            self.prevTime = now
             self.refreshCentroid()
 
             if next > now:
                 time.sleep(next - now)
 
     async def runAsync(self, stopAfterNFrames=0):
-        """Async simulation: start bot tasks and gui task,
-        then wait for them all to finish"""
-        botTasks = [robot.runAsync() for robot in self.robots]
+        """Async simulation: start the swarm scheduler and gui
+        task, then wait for them both to finish"""
+        schedulerTask = self.runScheduler()
         guiTask = self.runGuiAsync(stopAfterNFrames)
-        await asyncio.gather(guiTask, *botTasks)
+        await asyncio.gather(guiTask, schedulerTask)
+
+    async def runScheduler(self):
+        """One task drives the whole swarm: keep a deadline per
+        cohort in a numpy array, update every cohort that has
+        come due, and sleep until the nearest deadline. No
+        per-cohort sleeps parked in the event loop at all."""
+        naps = np.array([nap for nap, _ in self.cohorts])
+        now = time.perf_counter()
+        prevTimes = np.full(len(naps), now)
+        deadlines = now + naps
+        while self.keepRunning:
+            now = time.perf_counter()
+            ready = np.nonzero(deadlines <= now)[0]
+            for k in ready:
+                self.updateSubset(self.cohorts[k][1], now - prevTimes[k])
+            prevTimes[ready] = now
+            deadlines[ready] = now + naps[ready]
+            await asyncio.sleep(max(0.0, deadlines.min() - now))
 
     async def runGuiAsync(self, stopAfterNFrames):
         """Periodically update the screen"""
@@ -84,6 +229,7 @@ class Arena():
             self.handlePygameEvents()
             if self.keepRunning:
                 self.drawBots()
+                self.refreshCentroid()
                 nFrames += 1
                 if stopAfterNFrames and nFrames >= stopAfterNFrames:
                     self.keepRunning = False
@@ -98,7 +244,11 @@ class Arena():
         for more to come in. This lets it cooperate
         with another event loop, for instance asyncio.
         """
-        for event in pygame.event.get():
+        # peek costs nothing on the usual empty queue; only build
+        # an event list when something is actually pending
+        if not pygame.event.peek(self.wantedEvents):
+            return
+        for event in pygame.event.get(self.wantedEvents):
             if event.type == pygame.QUIT:
                 pygame.display.quit()
                 self.keepRunning = False
@@ -109,86 +259,96 @@ class Arena():
 
     def drawBots(self):
         """draw all the robots and update the screen to suit"""
-        # draw the arena background
-        self.surface.fill((0, 0, 0))
-        # draw the robots
-        for robot in self.robots:
-            robot.draw(self.surface)
+        # integer pixel coordinates of every on-screen robot
+        ix = self.positions[:, 0].astype(np.int32)
+        iy = self.positions[:, 1].astype(np.int32)
+        m = ((ix >= 0) & (ix < self.width)
+             & (iy >= 0) & (iy < self.height))
+        drawn = ix[m], iy[m]
+        # if nobody moved a whole pixel since last frame, the
+        # screen already shows this frame -- nothing to redraw
+        if (self.prevDrawn is not None
+                and np.array_equal(drawn[0], self.prevDrawn[0])
+                and np.array_equal(drawn[1], self.prevDrawn[1])):
+            return
+        # restore the background by erasing only the pixels we
+        # touched last frame, rather than clearing all of them
+        if self.prevDrawn is not None:
+            self.pixels[self.prevDrawn] = 0
+        # scatter all the robots into the pixel buffer at once
+        self.prevDrawn = drawn
+        self.pixels[drawn] = self.colors[m]
         # tell pygame to put robots on the screen
-        pygame.display.flip()
-
-    def findCentroid(self) -> XY:
+        self.blitArray(self.surface, self.pixels)
+        if self.renderer is not None:
+            self.texture.update(self.surface)
+            self.renderer.clear()
+            self.texture.draw()
+            self.renderer.present()
+        else:
+            self.flip()
+
+    def findCentroid(self) -> np.ndarray:
         """returns themost recently computed centroid"""
         # This relies on refreshCentroid() being called
         # whenever robots move, probably once per frame.
         # That leaves slightly stale data in the async case.
         return self.centroid
 
+    def updateAll(self, dt: float) -> None:
+        """
+        Advance every robot toward the centroid in one
+        vectorized pass. Dumb swarming: move in the direction
+        of overall centroid. Note: for large numbers of robots,
+        this will probably not converge to a single point.
+        Infrequently updated bots will overshoot the actual
+        centroid every time.
+        """
+        # Single process on purpose: the step is a memory-bound
+        # pass over 160KB of float32, far cheaper per frame than
+        # the barrier/wakeup round trip a shared-memory worker
+        # pool would add. Multi-core comes from numba's prange in
+        # the compiled kernel, when numba is installed.
+        # Bots mostly drift toward a near-stationary centroid, so
+        # last frame's normalization is still about right. Reuse
+        # it for a few frames; recompute when the centroid moves
+        # more than a pixel or the cache gets stale.
+        cached = self.invCache
+        if cached is not None:
+            self.invCacheAge += 1
+            drift = self.centroid - self.invCacheCentroid
+            if (self.invCacheAge >= 8
+                    or drift[0] * drift[0] + drift[1] * drift[1] > 1.0):
+                cached = None
+        inv = stepTowardCentroid(self.positions, self.centroid,
+                                 self.pixPerSecond * dt, cached,
+                                 self.stepScratch)
+        if cached is None:
+            self.invCache = inv
+            self.invCacheCentroid = self.centroid.copy()
+            self.invCacheAge = 0
+
+    def updateSubset(self, indices, dt: float) -> None:
+        """Like updateAll, but only for the robots at the given
+        indices. Used on the async path, where robots wake at
+        different times."""
+        # gather the subset into a reused buffer, step it, and
+        # scatter it back -- no fresh arrays along the way
+        p = self.subsetPositions[:len(indices)]
+        np.take(self.positions, indices, axis=0, out=p)
+        stepTowardCentroid(p, self.centroid, self.pixPerSecond * dt,
+                           scratch=self.subsetScratch)
+        self.positions[indices] = p
+
     def refreshCentroid(self):
         """Compute and save the centroid (mean position)
         of the swarm"""
-        sumx, sumy = 0, 0
-        for bot in self.robots:
-            x, y = bot.xy
-            sumx += x
-            sumy += y
-        nbots = len(self.robots)
-        self.centroid = sumx / nbots, sumy / nbots
+        # one vectorized reduction over the position array,
+        # instead of a Python loop over every robot; stays float32
+        self.centroid = self.positions.mean(axis=0)
         return self.centroid
 
 
-class Robot():
-
-    def __init__(self, arena: Arena, xy: XY, color: COLOR, nap: float):
-        self.arena = arena
-        self.xy = xy
-        self.color = color
-        self.nap = nap
-        self.prevTime = time.perf_counter()
-        # robots all travel the same speed, in whatever direction
-        self.pixPerSecond = 50
-
-    async def runAsync(self):
-        """loop doing update then nap, asynchronously"""
-        while self.arena.keepRunning:
-            self.update()
-            await asyncio.sleep(self.nap)
-
-    def update(self) -> None:
-        """
-        Dumb swarming: move in the direction of overall centroid.
-        Note: for large numbers of robots, this will probably not
-        converge to a single point. Infrequently updated bots
-        will overshoot the actual centroid every time.
-        """
-        now = time.perf_counter()
-        # how long has it been since previous update
-        dt = now - self.prevTime
-        # where we are now
-        x, y = self.xy
-        # where to move toward
-        cx, cy = self.arena.findCentroid()
-        # direction to centroid
-        # we could use atan2 then sin and cos
-        distx, disty = cx - x, cy - y
-        dist = max(1, math.hypot(distx, disty))
-        dirx, diry = distx / dist, disty / dist
-        # scalar and vector distance traveled since last update
-        travel = self.pixPerSecond * dt
-        dx, dy = travel * dirx, travel * diry
-        # increment position
-        self.xy = x + dx, y + dy
-        # save current timestamp for next update
-        self.prevTime = now
-
-    def draw(self, surface):
-        """robot draws itself on the surface"""
-        # With less dumb swarming, maybe interesting to draw a line
-        # from where it was last time to where it is now.
-        x, y = self.xy
-        pygame.draw.rect(surface, self.color, pygame.Rect(x, y, 1, 1))
-
-
 # ****************************************
 
 def simulate(numberOfRobots, useAsync, measureProfile, stopAfterNFrames):